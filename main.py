@@ -1,7 +1,65 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.exception_handlers import http_exception_handler
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from dataclasses import dataclass
 from datetime import date
+from pathlib import Path
+import json
+
+import orjson
+
+
+class User(BaseModel):
+    id: int
+    username: str
+    wallet: float
+    birthdate: date
+
+
+# Запись хранилища: уже проверенный User без накладных расходов pydantic, с готовым JSON
+@dataclass(slots=True, frozen=True)
+class UserRecord:
+    id: int
+    username: str
+    wallet: float
+    birthdate: date
+    json: bytes
+
+
+def _dump_user(data: Dict[str, Any]) -> bytes:
+    try:
+        return orjson.dumps(data)
+    except orjson.JSONEncodeError:
+        # orjson не кодирует целые шире 64 бит, а pydantic их принимает
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _to_record(user: User) -> UserRecord:
+    return UserRecord(
+        id=user.id,
+        username=user.username,
+        wallet=user.wallet,
+        birthdate=user.birthdate,
+        json=_dump_user(
+            {
+                "id": user.id,
+                "username": user.username,
+                "wallet": user.wallet,
+                "birthdate": user.birthdate.isoformat(),
+            }
+        ),
+    )
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, UserRecord):
+            return content.json
+        return orjson.dumps(content)
+
 
 app = FastAPI(
     title="User Management API",
@@ -25,154 +83,195 @@ app = FastAPI(
     - Баланс кошелька (`wallet`) передается в формате `float`.
     """,
     version="1.0.0",
+    openapi_tags=[
+        {
+            "name": "Users",
+            # Подробная справка по маршрутам с примерами запросов и ответов
+            "description": (Path(__file__).parent / "docs" / "users.md").read_text(encoding="utf-8"),
+        },
+    ],
+    default_response_class=ORJSONResponse,
 )
 
 
-class User(BaseModel):
-    id: int
-    username: str
-    wallet: float
-    birthdate: date
+# Фейковая база данных пользователей.
+# Словарь не изменяется на месте: запись собирает новый словарь и перепривязывает имя,
+# поэтому обработчики чтения всегда видят целостный снимок без блокировок.
+db_users: Dict[int, UserRecord] = {
+    1: _to_record(User(id=1, username="user1", wallet=100.0, birthdate=date(1990, 1, 1))),
+    2: _to_record(User(id=2, username="user2", wallet=200.0, birthdate=date(1995, 5, 15))),
+}
 
+# Неизменяемый снимок db_users в порядке добавления вместе со словарем, из которого он собран.
+# Публикуется только db_users; снимок пересобирается читателем, если словарь сменился
+_users_snapshot: Tuple[Dict[int, UserRecord], Tuple[UserRecord, ...]] = (db_users, tuple(db_users.values()))
 
-# Фейковая база данных пользователей
-db_users = [
-    User(id=1, username="user1", wallet=100.0, birthdate=date(1990, 1, 1)),
-    User(id=2, username="user2", wallet=200.0, birthdate=date(1995, 5, 15)),
-]
+# Сериализованный список пользователей (один кусок или пачки для потока) вместе со снимком,
+# из которого он собран
+_users_json_cache: Optional[Tuple[Tuple[UserRecord, ...], Tuple[bytes, ...]]] = None
 
 
-@app.get("/users/", response_model=List[User], tags=["Users"], summary="Получить всех пользователей")
-async def read_users():
-    """
-    ## Описание
-    Возвращает список всех пользователей.
-
-    ## Пример запроса
-    ```http
-    GET /users/
-    ```
-
-    ## Ответ
-    **200 OK**
-    ```json
-    [
-        {"id": 1, "username": "user1", "wallet": 100.0, "birthdate": "1990-01-01"},
-        {"id": 2, "username": "user2", "wallet": 200.0, "birthdate": "1995-05-15"}
+# Ответы об ошибках создаются один раз. traceback сбрасывается при каждом raise, иначе он
+# накапливался бы в общем экземпляре, и после обработки, чтобы не держать кадры запроса
+USER_NOT_FOUND = HTTPException(status_code=404, detail="User not found")
+USER_EXISTS = HTTPException(status_code=400, detail="User with this ID already exists")
+
+
+@app.exception_handler(HTTPException)
+async def _handle_http_exception(request: Request, exc: HTTPException) -> Response:
+    try:
+        return await http_exception_handler(request, exc)
+    finally:
+        if exc is USER_NOT_FOUND or exc is USER_EXISTS:
+            exc.__traceback__ = None
+
+# Списки длиннее порога отдаются потоком пачками: ответ не склеивается в один большой буфер,
+# и отправка начинается с первой пачки. Пачки кэшируются так же, как и короткий ответ
+_STREAM_THRESHOLD = 1000
+_STREAM_CHUNK_SIZE = 256
+
+
+def _is_json(content_type: Optional[str]) -> bool:
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    return media_type == "application/json" or (
+        media_type.startswith("application/") and media_type.endswith("+json")
+    )
+
+
+def _publish(users: Dict[int, UserRecord]) -> None:
+    global db_users
+    db_users = users
+
+
+def _snapshot() -> Tuple[UserRecord, ...]:
+    global _users_snapshot
+    users = db_users
+    snapshot = _users_snapshot
+    if snapshot[0] is not users:
+        snapshot = (users, tuple(users.values()))
+        _users_snapshot = snapshot
+    return snapshot[1]
+
+
+def _batch_users(users: Tuple[UserRecord, ...]) -> Tuple[bytes, ...]:
+    batches = [
+        b",".join([u.json for u in users[start : start + _STREAM_CHUNK_SIZE]])
+        for start in range(0, len(users), _STREAM_CHUNK_SIZE)
     ]
-    ```
-    """
-    return db_users
+    return (b"[" + batches[0], *[b"," + batch for batch in batches[1:]], b"]")
+
+
+async def _stream_users(chunks: Tuple[bytes, ...]) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+@app.get(
+    "/users/",
+    responses={200: {"model": List[User]}},
+    tags=["Users"],
+    summary="Получить всех пользователей",
+    description="Возвращает список всех пользователей.",
+)
+async def read_users():
+    global _users_json_cache
+    users = _snapshot()
+    stream = len(users) > _STREAM_THRESHOLD
+    cache = _users_json_cache
+    if cache is None or cache[0] is not users:
+        if stream:
+            chunks = _batch_users(users)
+        else:
+            chunks = (b"[" + b",".join([u.json for u in users]) + b"]",)
+        cache = (users, chunks)
+        _users_json_cache = cache
+    if stream:
+        return StreamingResponse(_stream_users(cache[1]), media_type="application/json")
+    return Response(cache[1][0], media_type="application/json")
 
 
-@app.get("/users/{user_id}", response_model=User, tags=["Users"], summary="Получить пользователя по ID")
+@app.get(
+    "/users/{user_id}",
+    responses={200: {"model": User}},
+    tags=["Users"],
+    summary="Получить пользователя по ID",
+    description="Возвращает данные пользователя по указанному ID.",
+)
 async def read_user(user_id: int):
-    """
-    ## Описание
-    Возвращает данные пользователя по указанному ID.
-
-    ## Пример запроса
-    ```http
-    GET /users/1
-    ```
-
-    ## Ответ
-    **200 OK**
-    ```json
-    {
-        "id": 1,
-        "username": "user1",
-        "wallet": 100.0,
-        "birthdate": "1990-01-01"
-    }
-    ```
-
-    **404 Not Found**
-    ```json
-    {
-        "detail": "User not found"
-    }
-    ```
-    """
-    user = next((user for user in db_users if user.id == user_id), None)
+    user = db_users.get(user_id)
     if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+        raise USER_NOT_FOUND.with_traceback(None)
+    return ORJSONResponse(user)
 
 
-@app.post("/users/", response_model=User, tags=["Users"], summary="Создать нового пользователя")
-async def create_user(user: User):
-    """
-    ## Описание
-    Добавляет нового пользователя в базу данных.
-
-    ## Пример запроса
-    ```http
-    POST /users/
-    Content-Type: application/json
-    {
-        "id": 3,
-        "username": "new_user",
-        "wallet": 50.0,
-        "birthdate": "2000-01-01"
-    }
-    ```
-
-    ## Ответ
-    **201 Created**
-    ```json
-    {
-        "id": 3,
-        "username": "new_user",
-        "wallet": 50.0,
-        "birthdate": "2000-01-01"
-    }
-    ```
-
-    **400 Bad Request**
-    ```json
-    {
-        "detail": "User with this ID already exists"
-    }
-    ```
-    """
-    if any(u.id == user.id for u in db_users):
-        raise HTTPException(status_code=400, detail="User with this ID already exists")
-    db_users.append(user)
-    return user
-
-
-@app.delete("/users/{user_id}", response_model=User, tags=["Users"], summary="Удалить пользователя")
+@app.post(
+    "/users/",
+    responses={
+        200: {"model": User},
+        # Тело разбирается вручную, поэтому FastAPI сам не добавляет ответ 422 в схему
+        422: {
+            "description": "Validation Error",
+            "content": {"application/json": {"schema": {"$ref": "#/components/schemas/HTTPValidationError"}}},
+        },
+    },
+    openapi_extra={
+        "requestBody": {
+            # Схема User уже зарегистрирована через responses=, ссылаемся на нее
+            "content": {"application/json": {"schema": {"$ref": "#/components/schemas/User"}}},
+            "required": True,
+        },
+    },
+    tags=["Users"],
+    summary="Создать нового пользователя",
+    description="Добавляет нового пользователя в базу данных.",
+)
+async def create_user(request: Request):
+    body = await request.body()
+    try:
+        if _is_json(request.headers.get("content-type")):
+            user = User.model_validate_json(body)
+        else:
+            # Как и FastAPI, тело без JSON-типа не разбирается и дает ту же ошибку 422
+            user = User.model_validate(body, from_attributes=True)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        )
+    if user.id in db_users:
+        raise USER_EXISTS.with_traceback(None)
+    record = _to_record(user)
+    _publish({**db_users, user.id: record})
+    return ORJSONResponse(record)
+
+
+@app.delete(
+    "/users/{user_id}",
+    responses={200: {"model": User}},
+    tags=["Users"],
+    summary="Удалить пользователя",
+    description="Удаляет пользователя по ID.",
+)
 async def delete_user(user_id: int):
-    """
-    ## Описание
-    Удаляет пользователя по ID.
-
-    ## Пример запроса
-    ```http
-    DELETE /users/1
-    ```
-
-    ## Ответ
-    **200 OK**
-    ```json
-    {
-        "id": 1,
-        "username": "user1",
-        "wallet": 100.0,
-        "birthdate": "1990-01-01"
-    }
-    ```
-
-    **404 Not Found**
-    ```json
-    {
-        "detail": "User not found"
-    }
-    ```
-    """
-    user_index = next((i for i, u in enumerate(db_users) if u.id == user_id), None)
-    if user_index is None:
-        raise HTTPException(status_code=404, detail="User not found")
-    deleted_user = db_users.pop(user_index)
-    return deleted_user
+    if user_id not in db_users:
+        raise USER_NOT_FOUND.with_traceback(None)
+    users = db_users.copy()
+    deleted_user = users.pop(user_id)
+    _publish(users)
+    return ORJSONResponse(deleted_user)
+
+
+if __name__ == "__main__":
+    import os
+
+    import uvicorn
+
+    # db_users живет в памяти процесса: у каждого воркера своя копия, поэтому по умолчанию один воркер
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_WORKERS", "1")),
+        access_log=False,
+    )
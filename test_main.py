@@ -0,0 +1,164 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def client():
+    users = main.db_users
+    yield TestClient(main.app)
+    main._publish(users)
+
+
+def _add_users(client, count, start_id=100):
+    for user_id in range(start_id, start_id + count):
+        response = client.post(
+            "/users/",
+            json={"id": user_id, "username": f"user{user_id}", "wallet": 1.5, "birthdate": "2000-01-02"},
+        )
+        assert response.status_code == 200
+
+
+def test_read_users_cached_payload(client):
+    response = client.get("/users/")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": 1, "username": "user1", "wallet": 100.0, "birthdate": "1990-01-01"},
+        {"id": 2, "username": "user2", "wallet": 200.0, "birthdate": "1995-05-15"},
+    ]
+
+
+def test_read_users_streamed_payload(client):
+    count = main._STREAM_THRESHOLD + main._STREAM_CHUNK_SIZE // 2
+    _add_users(client, count)
+
+    response = client.get("/users/")
+    assert response.status_code == 200
+    assert "content-length" not in response.headers
+
+    users = json.loads(response.content)
+    assert len(users) == count + 2
+    assert [u["id"] for u in users] == [1, 2, *range(100, 100 + count)]
+    assert users[-1] == {"id": 99 + count, "username": f"user{99 + count}", "wallet": 1.5, "birthdate": "2000-01-02"}
+
+    chunks = main._users_json_cache[1]
+    assert client.get("/users/").content == response.content
+    assert main._users_json_cache[1] is chunks
+
+    client.delete("/users/100")
+    users = json.loads(client.get("/users/").content)
+    assert len(users) == count + 1
+    assert 100 not in [u["id"] for u in users]
+
+
+def test_create_user_with_id_wider_than_64_bits(client):
+    user = {"id": 2**70, "username": "big", "wallet": 1.0, "birthdate": "2000-01-02"}
+
+    response = client.post("/users/", json=user)
+    assert response.status_code == 200
+    assert response.json() == user
+
+    assert client.get(f"/users/{2**70}").json() == user
+    assert client.get("/users/").json()[-1] == user
+
+
+def test_create_user_documents_validation_error(client):
+    spec = client.get("/openapi.json").json()
+    responses = spec["paths"]["/users/"]["post"]["responses"]
+    assert sorted(responses) == ["200", "422"]
+    assert responses["422"]["content"]["application/json"]["schema"] == {
+        "$ref": "#/components/schemas/HTTPValidationError"
+    }
+    assert "HTTPValidationError" in spec["components"]["schemas"]
+
+
+def test_create_user_request_body_references_user_schema(client):
+    spec = client.get("/openapi.json").json()
+    assert spec["paths"]["/users/"]["post"]["requestBody"] == {
+        "content": {"application/json": {"schema": {"$ref": "#/components/schemas/User"}}},
+        "required": True,
+    }
+    assert "User" in spec["components"]["schemas"]
+
+
+def test_create_user_invalid_body(client):
+    response = client.post("/users/", json={"id": 3, "username": "x", "wallet": 1.0, "birthdate": "2000-13-02"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "birthdate"]
+
+
+@pytest.mark.parametrize("content_type", ["text/plain", None])
+def test_create_user_rejects_non_json_content_type(client, content_type):
+    body = b'{"id": 3, "username": "x", "wallet": 1.0, "birthdate": "2000-01-02"}'
+    headers = {"content-type": content_type} if content_type else {}
+    response = client.post("/users/", content=body, headers=headers)
+    assert response.status_code == 422
+    assert response.json() == {
+        "detail": [
+            {
+                "type": "model_attributes_type",
+                "loc": ["body"],
+                "msg": "Input should be a valid dictionary or object to extract fields from",
+                "input": body.decode(),
+            }
+        ]
+    }
+    assert 3 not in main.db_users
+
+
+@pytest.mark.parametrize("content_type", ["application/json; charset=utf-8", "application/vnd.api+json"])
+def test_create_user_accepts_json_content_types(client, content_type):
+    body = b'{"id": 3, "username": "x", "wallet": 1.0, "birthdate": "2000-01-02"}'
+    response = client.post("/users/", content=body, headers={"content-type": content_type})
+    assert response.status_code == 200
+    assert response.json()["id"] == 3
+
+
+def test_delete_user(client):
+    response = client.delete("/users/1")
+    assert response.status_code == 200
+    assert response.json()["id"] == 1
+    assert [u["id"] for u in client.get("/users/").json()] == [2]
+
+
+def test_delete_missing_user_keeps_snapshot(client):
+    users = main.db_users
+    response = client.delete("/users/999")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "User not found"}
+    assert main.db_users is users
+
+
+def test_birthdate_served_as_iso(client):
+    response = client.post("/users/", json={"id": 3, "username": "x", "wallet": 1.0, "birthdate": "2000-01-02"})
+    assert response.json()["birthdate"] == "2000-01-02"
+    assert client.get("/users/3").json()["birthdate"] == "2000-01-02"
+    assert main.User.model_json_schema()["properties"]["birthdate"]["format"] == "date"
+
+
+def test_read_users_follows_republished_dict(client):
+    first = client.get("/users/").json()
+    main._publish({k: v for k, v in main.db_users.items() if k != 1})
+    assert [u["id"] for u in client.get("/users/").json()] == [2]
+    assert len(first) == 2
+
+
+def test_read_missing_user_twice(client):
+    for _ in range(2):
+        response = client.get("/users/999")
+        assert response.status_code == 404
+        assert response.json() == {"detail": "User not found"}
+        assert main.USER_NOT_FOUND.__traceback__ is None
+
+
+def test_create_duplicate_user_twice(client):
+    user = {"id": 1, "username": "dup", "wallet": 1.0, "birthdate": "2000-01-02"}
+    for _ in range(2):
+        response = client.post("/users/", json=user)
+        assert response.status_code == 400
+        assert response.json() == {"detail": "User with this ID already exists"}
+        assert main.USER_EXISTS.__traceback__ is None
+    assert client.get("/users/1").json()["username"] == "user1"